@@ -14,6 +14,7 @@ from termstyle import bold, green, inverted, red
 
 import intelmq.bin.intelmqctl as intelmqctl
 import intelmq.lib.exceptions as exceptions
+import intelmq.lib.message as message
 import intelmq.lib.pipeline as pipeline
 import intelmq.lib.utils as utils
 from intelmq import DEFAULT_LOGGING_PATH, DEFAULTS_CONF_FILE, RUNTIME_CONF_FILE
@@ -237,6 +238,13 @@ def main():
             runtime = utils.load_configuration(RUNTIME_CONF_FILE)
             params = utils.load_parameters(default, runtime)
             pipe = pipeline.PipelineFactory.create(params)
+            # the serializer of the bot, which may be set in its runtime parameters
+            serializer = runtime.get(botid, {}).get('parameters', {}).get(
+                'serializer', default.get('serializer', 'json'))
+            if serializer != 'json' and (queue_name is not None or len(answer) == 3):
+                print(red('Messages are reinjected with the serializer {!r} of bot {}, '
+                          'the bot reading the given queue must use the same.'
+                          ''.format(serializer, botid)))
             try:
                 for i, (key, entry) in enumerate([item for (count, item)
                                                   in enumerate(content.items()) if count in ids]):
@@ -252,6 +260,10 @@ def main():
                             queue_name = answer[2]
                         else:
                             queue_name = entry['source_queue']
+                    if serializer != 'json':
+                        # dumps are always JSON-encoded
+                        msg = message.MessageFactory.serialize(message.MessageFactory.unserialize(msg),
+                                                               serializer=serializer)
                     try:
                         pipe.set_queues(queue_name, 'destination')
                         pipe.connect()
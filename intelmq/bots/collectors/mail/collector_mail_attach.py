@@ -6,14 +6,35 @@ https://github.com/martinrusev/imbox/commit/7c6cc2fb5f7e39c1496d68f3d432eec19517
 """
 import re
 import zipfile
+from typing import Optional
 
+from intelmq.lib import utils
 from intelmq.lib.bot import CollectorBot
+from intelmq.lib.splitreports import generate_reports
 
 try:
     import imbox
 except ImportError:
     imbox = None
 
+# folded header lines
+FOLDED_WHITESPACE = re.compile(r"\r\n\s")
+
+
+def first_zipped_file(zipped: zipfile.ZipFile,
+                      max_decompressed_size: Optional[int]=None) -> zipfile.ZipInfo:
+    """
+    Returns the info of the first file in the archive.
+
+    Raises:
+        ValueError: if the decompressed size of the file exceeds max_decompressed_size
+    """
+    zipinfo = zipped.infolist()[0]
+    if max_decompressed_size and zipinfo.file_size > max_decompressed_size:
+        raise ValueError('Decompressed size is {} bytes, which exceeds the maximum of '
+                         '{} bytes.'.format(zipinfo.file_size, max_decompressed_size))
+    return zipinfo
+
 
 class MailAttachCollectorBot(CollectorBot):
 
@@ -22,48 +43,80 @@ class MailAttachCollectorBot(CollectorBot):
             self.logger.error('Could not import imbox. Please install it.')
             self.stop()
 
+        self.chunk_size = getattr(self.parameters, 'chunk_size', None)
+        self.chunk_replicate_header = getattr(self.parameters,
+                                              'chunk_replicate_header', None)
+        self.max_decompressed_size = getattr(self.parameters,
+                                             'max_decompressed_size', None)
+
+        if self.parameters.subject_regex:
+            self.subject_regex = re.compile(self.parameters.subject_regex)
+        else:
+            self.subject_regex = None
+        self.attach_regex = re.compile(self.parameters.attach_regex)
+
     def process(self):
         mailbox = imbox.Imbox(self.parameters.mail_host,
                               self.parameters.mail_user,
                               self.parameters.mail_password,
                               self.parameters.mail_ssl)
         emails = mailbox.messages(folder=self.parameters.folder, unread=True)
+        seen_uids = set()
 
-        if emails:
-            for uid, message in emails:
-
-                if (self.parameters.subject_regex and
-                        not re.search(self.parameters.subject_regex,
-                                      re.sub("\r\n\s", " ", message.subject))):
-                    continue
+        try:
+            if emails:
+                for uid, message in emails:
 
-                for attach in message.attachments:
-                    if not attach:
+                    if (self.subject_regex and
+                            not self.subject_regex.search(FOLDED_WHITESPACE.sub(" ", message.subject))):
                         continue
 
-                    attach_filename = attach['filename']
-                    if attach_filename.startswith('"'):  # for imbox versions older than 0.9.5, see also above
-                        attach_filename = attach_filename[1:-1]
-
-                    if re.search(self.parameters.attach_regex, attach_filename):
-
-                        if self.parameters.attach_unzip:
-                            zipped = zipfile.ZipFile(attach['content'])
-                            raw_report = zipped.read(zipped.namelist()[0])
-                        else:
-                            raw_report = attach['content'].read()
-
-                        report = self.new_report()
-                        report.add("raw", raw_report)
-
-                        self.send_message(report)
-
-                        # Only mark read if message relevant to this instance,
-                        # so other instances watching this mailbox will still
-                        # check it.
-                        mailbox.mark_seen(uid)
-                self.logger.debug("Email report read.")
+                    for attach in message.attachments:
+                        if not attach:
+                            continue
+
+                        attach_filename = attach['filename']
+                        if attach_filename.startswith('"'):  # for imbox versions older than 0.9.5, see also above
+                            attach_filename = attach_filename[1:-1]
+
+                        if self.attach_regex.search(attach_filename):
+
+                            if self.parameters.attach_unzip:
+                                with zipfile.ZipFile(attach['content']) as zipped:
+                                    try:
+                                        zipinfo = first_zipped_file(zipped, self.max_decompressed_size)
+                                    except ValueError as exc:
+                                        # the mail is marked as read nevertheless
+                                        self.logger.error('Ignoring attachment %r: %s',
+                                                          attach_filename, exc)
+                                    else:
+                                        with zipped.open(zipinfo) as raw_report:
+                                            self.send_reports(raw_report)
+                            else:
+                                self.send_reports(attach['content'])
+
+                            # Only mark read if message relevant to this instance,
+                            # so other instances watching this mailbox will still
+                            # check it.
+                            seen_uids.add(utils.decode(uid))
+                    self.logger.debug("Email report read.")
+        finally:
+            # Mark all relevant messages as read with one command instead of one per message,
+            # also if the processing failed for a later message
+            if seen_uids:
+                mailbox.connection.uid('STORE', ','.join(sorted(seen_uids, key=int)),
+                                       '+FLAGS', r'(\Seen)')
         mailbox.logout()
 
+    def send_reports(self, raw_report):
+        """
+        Sends the attachment as reports, read (and decompressed) in chunks
+        if chunk_size is given.
+        """
+        template = self.new_report()
+        for report in generate_reports(template, raw_report, self.chunk_size,
+                                       self.chunk_replicate_header):
+            self.send_message(report)
+
 
 BOT = MailAttachCollectorBot
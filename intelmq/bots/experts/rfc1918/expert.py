@@ -31,6 +31,27 @@ NETWORKS = ("10.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8",
             "255.255.255.255/32", "fe80::/64", "2001:0db8::/32")
 DOMAINS = ('.test', '.example', '.invalid', '.localhost', 'example.com',
            'example.net', 'example.org')
+IP_NETWORKS = tuple(ipaddress.ip_network(network) for network in NETWORKS)
+
+
+def check_ip(value):
+    ip_address = ipaddress.ip_address(value)
+    return any(ip_address in network for network in IP_NETWORKS)
+
+
+def check_fqdn(value):
+    return value.endswith(DOMAINS)
+
+
+def check_url(value):
+    return urlparse(value).netloc.endswith(DOMAINS)
+
+
+# the check to use for a field, by the last part of its name
+CHECKS = {'ip': check_ip,
+          'fqdn': check_fqdn,
+          'url': check_url,
+          }
 
 
 class RFC1918ExpertBot(Bot):
@@ -39,24 +60,22 @@ class RFC1918ExpertBot(Bot):
         self.fields = self.parameters.fields.lower().strip().split(",")
         self.policy = self.parameters.policy.lower().strip().split(",")
 
-    def is_in_net(self, ip, iprange):
-        return ipaddress.ip_address(ip) in ipaddress.ip_network(iprange)
+        self.checks = []
+        for field, policy in zip(self.fields, self.policy):
+            try:
+                check = CHECKS[field.rpartition('.')[2]]
+            except KeyError:
+                raise ValueError('Field {!r} is not supported, only fields ending '
+                                 'with .ip, .fqdn or .url are.'.format(field))
+            self.checks.append((field, policy, check))
 
     def process(self):
         event = self.receive_message()
 
-        for field, policy in zip(self.fields, self.policy):
+        for field, policy, check in self.checks:
             if field not in event:
                 continue
-            value = event.get(field)
-            if field.endswith('.ip'):
-                check = any(self.is_in_net(value, iprange) for iprange in NETWORKS)
-            elif field.endswith('.fqdn'):
-                check = any(value.endswith(domain) for domain in DOMAINS)
-            elif field.endswith('.url'):
-                check = any(urlparse(value).netloc.endswith(domain)
-                            for domain in DOMAINS)
-            if check:
+            if check(event[field]):
                 if policy == 'del':
                     self.logger.debug("Value removed from %s.", field)
                     del event[field]
@@ -11,15 +11,18 @@ class OpenPhishParserBot(Bot):
 
         raw_report = utils.base64_decode(report.get("raw"))
 
+        # the fields shared by all events are only added and checked once
+        template = self.new_event(report)
+        template.add('classification.type', 'phishing')
+
         for row in raw_report.splitlines():
 
             row = row.strip()
             if row == "":
                 continue
 
-            event = self.new_event(report)
+            event = template.copy()
 
-            event.add('classification.type', 'phishing')
             event.add('source.url', row)
             event.add('raw', row)
 
@@ -69,6 +69,7 @@ class Bot(object):
         try:
             self.logger.info('Bot is starting.')
             self.__load_runtime_configuration()
+            libmessage.check_serializer(self.parameters.serializer)
             self.__load_pipeline_configuration()
             self.__load_harmonization_configuration()
 
@@ -348,7 +349,8 @@ class Bot(object):
                 self.__message_counter = 0
                 self.__message_counter_start = datetime.datetime.now()
 
-            raw_message = libmessage.MessageFactory.serialize(message)
+            raw_message = libmessage.MessageFactory.serialize(message,
+                                                              serializer=self.parameters.serializer)
             self.__destination_pipeline.send(raw_message)
 
     def receive_message(self):
@@ -365,7 +367,8 @@ class Bot(object):
 
         try:
             self.__current_message = libmessage.MessageFactory.unserialize(message,
-                                                                           harmonization=self.harmonization)
+                                                                           harmonization=self.harmonization,
+                                                                           serializer=self.parameters.serializer)
         except exceptions.InvalidKey as exc:
             # In case a incoming message is malformed an does not conform with the currently
             # loaded harmonization, stop now as this will happen repeatedly without any change
@@ -419,6 +422,7 @@ class Bot(object):
         config = utils.load_configuration(DEFAULTS_CONF_FILE)
 
         setattr(self.parameters, 'logging_path', DEFAULT_LOGGING_PATH)
+        setattr(self.parameters, 'serializer', 'json')
 
         for option, value in config.items():
             setattr(self.parameters, option, value)
@@ -112,7 +112,8 @@ class BotDebugger:
 
     def _process(self, dryrun, msg):
         if msg:
-            msg = MessageFactory.serialize(self.arg2msg(msg))
+            msg = MessageFactory.serialize(self.arg2msg(msg),
+                                           serializer=self.instance.parameters.serializer)
             self.instance._Bot__source_pipeline.receive = lambda: msg
             self.instance.logger.info(" * Message from cli will be used when processing.")
 
@@ -4,8 +4,12 @@ Messages are the information packages in pipelines.
 
 Use MessageFactory to get a Message object (types Report and Event).
 """
+import bisect
+import copy
+import functools
 import hashlib
 import json
+import math
 import re
 import warnings
 
@@ -13,17 +17,155 @@ import intelmq.lib.exceptions as exceptions
 import intelmq.lib.harmonization
 from intelmq import HARMONIZATION_CONF_FILE
 from intelmq.lib import utils
-from typing import Sequence, Optional
+from typing import Sequence, Optional, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 __all__ = ['Event', 'Message', 'MessageFactory', 'Report']
 VALID_MESSSAGE_TYPES = ('Event', 'Message', 'Report')
+VALID_SERIALIZERS = ('json', 'msgpack')
+# fields of a report which are copied to events created from it
+EVENT_TEMPLATE_KEYS = ('feed.accuracy', 'feed.code', 'feed.documentation',
+                       'feed.name', 'feed.provider', 'feed.url', 'rtir_id',
+                       'time.observation')
+
+HARMONIZATION_KEY_REGEX = re.compile(r'^[a-z_](.[a-z_0-9]+)*\Z')
+# values which are treated as missing by add and is_valid
+_EMPTY_SENTINELS = frozenset(("", "-", "N/A"))
+
+if msgpack is not None:
+    _packer = msgpack.Packer(use_bin_type=True)
+# prepared harmonization configurations, by id of the original
+_prepared_harmonizations = {}
+
+
+def _is_finite(obj) -> bool:
+    """
+    Checks if obj, or any value of it, is no infinite or NaN float.
+    """
+    if isinstance(obj, float):
+        return math.isfinite(obj)
+    if isinstance(obj, dict):
+        return all(_is_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return all(_is_finite(value) for value in obj)
+    return True
+
+
+def _json_dumps(obj, **kwargs) -> str:
+    """
+    JSON-encodes obj with orjson if it is installed, otherwise with json.
+
+    Parameters:
+        obj: the object to encode
+        **kwargs: passed to json.dumps if orjson is not used
+
+    Returns:
+        the JSON-encoded string
+    """
+    # orjson writes infinite and NaN floats as null
+    if orjson is not None and _is_finite(obj):
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:  # e.g. integers larger than 64 bit
+            pass
+    return json.dumps(obj, **kwargs)
+
+
+def _json_loads(raw: Union[bytes, str]):
+    """
+    Decodes JSON with orjson if it is installed, otherwise with json.
+
+    orjson returns integers beyond 64 bit as floats. _json_dumps writes such
+    integers with json, so messages containing them are decoded with json too.
+    JSON which orjson rejects, but json accepts, is decoded with json as well.
+    """
+    if orjson is not None:
+        try:
+            loaded = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # e.g. NaN, Infinity or lone surrogates written by json
+            return json.loads(raw)
+        if not isinstance(loaded, dict) or not any(
+                isinstance(value, float) and abs(value) >= 2 ** 63 and value.is_integer()
+                for value in loaded.values()):
+            return loaded
+    return json.loads(raw)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_harmonization(path: str) -> dict:
+    """
+    Loads the harmonization configuration once per path and process.
+    """
+    return utils.load_configuration(path)
+
+
+def _prepare_harmonization(harmonization_config: dict) -> dict:
+    """
+    Checks the keys of the harmonization configuration of a message type and
+    prepares it for validation: The types are resolved to their classes and
+    validation/sanitation functions and the regular expressions are compiled.
+
+    The preparation is only done once per configuration object.
+
+    Returns:
+        prepared configuration, same keys as harmonization_config
+
+    Raises:
+        intelmq.lib.exceptions.InvalidKey: if a key is invalid.
+    """
+    cached = _prepared_harmonizations.get(id(harmonization_config))
+    if cached and cached[0] is harmonization_config:
+        return cached[1]
+    prepared = {}
+    for harm_key, config in harmonization_config.items():
+        if not HARMONIZATION_KEY_REGEX.match(harm_key) and harm_key != '__type':
+            raise exceptions.InvalidKey("Harmonization key %r is invalid." % harm_key)
+        config = prepared[harm_key] = config.copy()
+        if 'type' in config:
+            config['type'] = getattr(intelmq.lib.harmonization, config['type'])
+            # the methods are static, no instances are needed
+            config['is_valid'] = config['type'].is_valid
+            config['sanitize'] = config['type'].sanitize
+        if 'regex' in config:
+            config['regex'] = re.compile(config['regex'])
+        if 'iregex' in config:
+            config['iregex'] = re.compile(config['iregex'], re.IGNORECASE)
+    if len(_prepared_harmonizations) >= 32:
+        _prepared_harmonizations.clear()
+    # keeping the reference also ensures that the id is not reused
+    _prepared_harmonizations[id(harmonization_config)] = (harmonization_config, prepared)
+    return prepared
+
+
+def check_serializer(serializer: str):
+    """
+    Checks if the given serializer is known and usable.
+
+    Raises:
+        intelmq.lib.exceptions.InvalidArgument: if serializer is unknown.
+        ValueError: if serializer is 'msgpack' but msgpack is not installed.
+    """
+    if serializer not in VALID_SERIALIZERS:
+        raise exceptions.InvalidArgument('serializer', got=serializer,
+                                         expected=VALID_SERIALIZERS)
+    if serializer == 'msgpack' and msgpack is None:
+        raise ValueError('Could not import msgpack. Please install it.')
 
 
 class MessageFactory(object):
     """
-    unserialize: JSON encoded message to object
-    serialize: object to JSON encoded object
+    unserialize: JSON (or msgpack) encoded message to object
+    serialize: object to JSON (or msgpack) encoded object
     """
 
     @staticmethod
@@ -54,8 +196,9 @@ class MessageFactory(object):
         return class_reference(message, auto=True, harmonization=harmonization)
 
     @staticmethod
-    def unserialize(raw_message: str, harmonization: dict=None,
-                    default_type: Optional[str]=None) -> dict:
+    def unserialize(raw_message: Union[bytes, str], harmonization: dict=None,
+                    default_type: Optional[str]=None,
+                    serializer: str='json') -> dict:
         """
         Takes JSON-encoded Message object, returns instance of correct class.
 
@@ -63,23 +206,25 @@ class MessageFactory(object):
             message: the message which should be converted to a Message object
             harmonization: a dictionary holding the used harmonization
             default_type: If '__type' is not present in message, the given type will be used
+            serializer: The format of raw_message, one of VALID_SERIALIZERS
 
         See also:
             MessageFactory.from_dict
             MessageFactory.serialize
         """
-        message = Message.unserialize(raw_message)
+        message = Message.unserialize(raw_message, serializer=serializer)
         return MessageFactory.from_dict(message, harmonization=harmonization,
                                         default_type=default_type)
 
     @staticmethod
-    def serialize(message):
+    def serialize(message, serializer: str='json'):
         """
         Takes instance of message-derived class and makes JSON-encoded Message.
+        If serializer is 'msgpack', the result are msgpack-encoded bytes.
 
         The class is saved in __type attribute.
         """
-        raw_message = Message.serialize(message)
+        raw_message = Message.serialize(message, serializer=serializer)
         return raw_message
 
 
@@ -93,7 +238,7 @@ class Message(dict):
             classname = self.__class__.__name__.lower()
 
         if harmonization is None:
-            harmonization = utils.load_configuration(HARMONIZATION_CONF_FILE)
+            harmonization = _load_harmonization(HARMONIZATION_CONF_FILE)
         try:
             self.harmonization_config = harmonization[classname]
         except KeyError:
@@ -101,10 +246,8 @@ class Message(dict):
                                              got=classname,
                                              expected=VALID_MESSSAGE_TYPES,
                                              docs=HARMONIZATION_CONF_FILE)
-
-        for harm_key in self.harmonization_config.keys():
-            if not re.match('^[a-z_](.[a-z_0-9]+)*$', harm_key) and harm_key != '__type':
-                raise exceptions.InvalidKey("Harmonization key %r is invalid." % harm_key)
+        self._prepared_config = _prepare_harmonization(self.harmonization_config)
+        self._reset_caches()
 
         super(Message, self).__init__()
         if isinstance(message, dict):
@@ -112,12 +255,38 @@ class Message(dict):
         elif isinstance(message, tuple):
             iterable = message
         for key, value in iterable:
-            if not self.add(key, value, sanitize=False, raise_failure=False):
-                self.add(key, value, sanitize=True)
+            self.__add_unsanitized_first(key, value)
 
     def __setitem__(self, key, value):
         self.add(key, value)
 
+    def _reset_caches(self):
+        """
+        Drops the data derived from the values, called on every change.
+        """
+        self._hash_cache = None
+        self._sorted_cache = None
+
+    def __delitem__(self, key):
+        self._reset_caches()
+        super(Message, self).__delitem__(key)
+
+    def clear(self):
+        self._reset_caches()
+        super(Message, self).clear()
+
+    def pop(self, *args):
+        self._reset_caches()
+        return super(Message, self).pop(*args)
+
+    def popitem(self):
+        self._reset_caches()
+        return super(Message, self).popitem()
+
+    def setdefault(self, key, default=None):
+        self._reset_caches()
+        return super(Message, self).setdefault(key, default)
+
     def is_valid(self, key: str, value: str, sanitize: bool=True) -> bool:
         """
         Checks if a value is valid for the key (after sanitation).
@@ -135,14 +304,13 @@ class Message(dict):
             intelmq.lib.exceptions.InvalidKey: if given key is invalid.
 
         """
-        if not self.__is_valid_key(key):
-            raise exceptions.InvalidKey(key)
+        config = self.__get_config(key)
 
-        if value is None or value in ["", "-", "N/A"]:
+        if value is None or (isinstance(value, str) and value in _EMPTY_SENTINELS):
             return False
-        if sanitize:
-            value = self.__sanitize_value(key, value)
-        valid = self.__is_valid_value(key, value)
+        if sanitize and config is not None:
+            value = config['sanitize'](value)
+        valid = self.__is_valid_value(config, value)
         if valid[0]:
             return True
         return False
@@ -177,13 +345,12 @@ class Message(dict):
         if not overwrite and key in self:
             raise exceptions.KeyExists(key)
 
-        if value is None or value in ["", "-", "N/A"]:
+        if value is None or (isinstance(value, str) and value in _EMPTY_SENTINELS):
             if overwrite and key in self:
                 del self[key]
             return
 
-        if not self.__is_valid_key(key):
-            raise exceptions.InvalidKey(key)
+        config = self.__get_config(key)
 
         try:
             if value in ignore:
@@ -193,29 +360,59 @@ class Message(dict):
                                              got=type(ignore),
                                              expected='list or tuple')
 
-        if sanitize and not key == '__type':
+        return self.__add_checked(key, value, config, sanitize=sanitize,
+                                  raise_failure=raise_failure)
+
+    def __add_checked(self, key: str, value: str, config: Optional[dict],
+                      sanitize: bool, raise_failure: bool) -> bool:
+        """
+        Sanitizes, validates and saves the value. The key and value have
+        already been checked by the caller like in add, config is the
+        prepared harmonization of the key (None for __type).
+        """
+        if sanitize and config is not None:
             old_value = value
-            value = self.__sanitize_value(key, value)
+            value = config['sanitize'](value)
             if value is None:
                 if raise_failure:
                     raise exceptions.InvalidValue(key, old_value)
                 else:
                     return False
 
-        valid_value = self.__is_valid_value(key, value)
+        valid_value = self.__is_valid_value(config, value)
         if not valid_value[0]:
             if raise_failure:
                 raise exceptions.InvalidValue(key, value, reason=valid_value[1])
             else:
                 return False
 
+        self._reset_caches()
         super(Message, self).__setitem__(key, value)
         return True
 
+    def __add_unsanitized_first(self, key: str, value: str, overwrite: bool=False):
+        """
+        Adds the value without sanitation if it is valid, otherwise with
+        sanitation. Does the checks of add only once for both tries.
+        """
+        if not overwrite and key in self:
+            raise exceptions.KeyExists(key)
+
+        if value is None or (isinstance(value, str) and value in _EMPTY_SENTINELS):
+            if overwrite and key in self:
+                del self[key]
+            return
+
+        config = self.__get_config(key)
+
+        if not self.__add_checked(key, value, config, sanitize=False,
+                                  raise_failure=False):
+            self.__add_checked(key, value, config, sanitize=True,
+                               raise_failure=True)
+
     def update(self, other: dict):
         for key, value in other.items():
-            if not self.add(key, value, sanitize=False, raise_failure=False, overwrite=True):
-                self.add(key, value, sanitize=True, overwrite=True)
+            self.__add_unsanitized_first(key, value, overwrite=True)
 
     def change(self, key: str, value: str, sanitize: bool=True):
         if key not in self:
@@ -223,71 +420,107 @@ class Message(dict):
         return self.add(key, value, overwrite=True, sanitize=sanitize)
 
     def finditems(self, keyword: str):
-        for key, value in super(Message, self).items():
-            if key.startswith(keyword):
-                yield key, value
+        """
+        Yields all items whose key starts with keyword, sorted by key.
+        """
+        keys, values = self.__sorted_items()
+        index = bisect.bisect_left(keys, keyword)
+        while index < len(keys) and keys[index].startswith(keyword):
+            yield keys[index], values[index]
+            index += 1
+
+    def __sorted_items(self):
+        """
+        Returns a tuple of the sorted keys and a tuple of the corresponding
+        values. The result is cached until the message is changed.
+        """
+        if self._sorted_cache is None:
+            if not self:
+                self._sorted_cache = ((), ())
+            else:
+                self._sorted_cache = tuple(zip(*sorted(super(Message, self).items())))
+        return self._sorted_cache
 
     def copy(self):
-        class_ref = self.__class__.__name__
-        self['__type'] = class_ref
-        retval = getattr(intelmq.lib.message,
-                         class_ref)(super(Message, self).copy(),
-                                    harmonization={self.__class__.__name__.lower(): self.harmonization_config})
-        del self['__type']
+        """
+        Returns a shallow copy of the message of the same class. The values
+        are not validated again and no fields are added (like
+        time.observation for reports).
+        """
+        retval = self.__class__.__new__(self.__class__)
+        # harmonization and caches, which are also valid for the copy
+        retval.__dict__.update(self.__dict__)
+        super(Message, retval).update(self)
         return retval
 
     def deep_copy(self):
-        return MessageFactory.unserialize(MessageFactory.serialize(self),
-                                          harmonization={self.__class__.__name__.lower(): self.harmonization_config})
+        retval = self.__class__(auto=True,
+                                harmonization={self.__class__.__name__.lower(): self.harmonization_config})
+        # the values have already been validated
+        super(Message, retval).update(copy.deepcopy(dict(self)))
+        return retval
 
     def __str__(self):
         return self.serialize()
 
-    def serialize(self):
-        self['__type'] = self.__class__.__name__
-        json_dump = utils.decode(json.dumps(self))
-        del self['__type']
-        return json_dump
+    def serialize(self, serializer: str='json'):
+        check_serializer(serializer)
+        message = dict(self)
+        message['__type'] = self.__class__.__name__
+        if serializer == 'msgpack':
+            try:
+                return _packer.pack(message)
+            except (OverflowError, UnicodeEncodeError):
+                # e.g. integers beyond 64 bit or strings with lone surrogates
+                for key, value in message.items():
+                    try:
+                        _packer.pack(value)
+                    except (OverflowError, UnicodeEncodeError) as exc:
+                        raise exceptions.InvalidValue(key, value,
+                                                      reason='cannot be serialized '
+                                                      'with msgpack: {}'.format(exc))
+                raise
+        return _json_dumps(message)
 
     @staticmethod
-    def unserialize(message_string: str):
-        message = json.loads(message_string)
+    def unserialize(message_string: Union[bytes, str], serializer: str='json'):
+        check_serializer(serializer)
+        if serializer == 'msgpack':
+            return msgpack.unpackb(message_string, raw=False)
+        message = _json_loads(message_string)
         return message
 
-    def __is_valid_key(self, key: str):
-        if key in self.harmonization_config or key == '__type':
-            return True
-        return False
+    def __get_config(self, key: str) -> Optional[dict]:
+        """
+        Returns the prepared harmonization of the key, None for __type.
+
+        Raises:
+            intelmq.lib.exceptions.InvalidKey: if key is invalid.
+        """
+        config = self._prepared_config.get(key)
+        if config is None and key != '__type':
+            raise exceptions.InvalidKey(key)
+        return config
 
-    def __is_valid_value(self, key: str, value: str):
-        if key == '__type':
+    def __is_valid_value(self, config: Optional[dict], value: str):
+        if config is None:
             return (True, )
-        config = self.__get_type_config(key)
-        class_reference = getattr(intelmq.lib.harmonization, config['type'])
-        if not class_reference().is_valid(value):
+        if not config['is_valid'](value):
             return (False, 'is_valid returned False.')
-        if 'length' in config:
-            length = len(str(value))
-            if not length <= config['length']:
-                return (False, 'too long: {} > {}.'.format(length,
-                                                           config['length']))
-        if 'regex' in config:
-            if not re.search(config['regex'], str(value)):
-                return (False, 'regex did not match.')
-        if 'iregex' in config:
-            if not re.search(config['iregex'], str(value), re.IGNORECASE):
-                return (False, 'regex (case insensitive) did not match.')
+        max_length = config.get('length')
+        regex = config.get('regex')
+        iregex = config.get('iregex')
+        if max_length is None and regex is None and iregex is None:
+            return (True, )
+        value = str(value)
+        if max_length is not None and not len(value) <= max_length:
+            return (False, 'too long: {} > {}.'.format(len(value), max_length))
+        if regex is not None and not regex.search(value):
+            return (False, 'regex did not match.')
+        if iregex is not None and not iregex.search(value):
+            return (False, 'regex (case insensitive) did not match.')
         return (True, )
 
-    def __sanitize_value(self, key: str, value: str):
-        class_name = self.__get_type_config(key)['type']
-        class_reference = getattr(intelmq.lib.harmonization, class_name)
-        return class_reference().sanitize(value)
-
-    def __get_type_config(self, key: str):
-        class_name = self.harmonization_config[key]
-        return class_name
-
     def __hash__(self):
         return int(self.hash(), 16)
 
@@ -300,6 +533,8 @@ class Message(dict):
         parameter should be a set.
 
         'time.observation' will always be ignored.
+
+        The hash without filters is cached until the message is changed.
         """
 
         if filter_type not in ["whitelist", "blacklist"]:
@@ -308,9 +543,13 @@ class Message(dict):
                                              got=filter_type,
                                              expected=['whitelist', 'blacklist'])
 
-        event_hash = hashlib.sha256()
+        use_cache = filter_type == "blacklist" and not filter_keys
+        if use_cache and self._hash_cache is not None:
+            return self._hash_cache
 
-        for key, value in sorted(self.items()):
+        hash_input = []
+
+        for key, value in zip(*self.__sorted_items()):
             if "time.observation" == key:
                 continue
 
@@ -320,19 +559,21 @@ class Message(dict):
             if filter_type == "blacklist" and key in filter_keys:
                 continue
 
-            event_hash.update(utils.encode(key))
-            event_hash.update(b"\xc0")
-            event_hash.update(utils.encode(repr(value)))
-            event_hash.update(b"\xc0")
+            # The values are validated str, int, float and bool objects, their
+            # repr is stable. Changing the format would invalidate all hashes
+            # stored e.g. by the deduplicator. Keys and reprs are always str.
+            hash_input.extend((key.encode(), b"\xc0",
+                               repr(value).encode(), b"\xc0"))
 
-        return event_hash.hexdigest()
+        # hash all data at once instead of per item
+        event_hash = hashlib.sha256(b"".join(hash_input)).hexdigest()
+        if use_cache:
+            self._hash_cache = event_hash
+        return event_hash
 
     def to_dict(self, hierarchical: bool=False, with_type: bool=False):
         json_dict = dict()
 
-        if with_type:
-            self['__type'] = self.__class__.__name__
-
         for key, value in self.items():
             if hierarchical:
                 subkeys = key.split('.')
@@ -351,13 +592,13 @@ class Message(dict):
                 json_dict_fp = json_dict_fp[subkey]
 
         if with_type:
-            del self['__type']
+            json_dict['__type'] = self.__class__.__name__
 
         return json_dict
 
     def to_json(self, hierarchical=False, with_type=False):
         json_dict = self.to_dict(hierarchical=hierarchical, with_type=with_type)
-        return json.dumps(json_dict, ensure_ascii=False)
+        return _json_dumps(json_dict, ensure_ascii=False)
 
 
 class Event(Message):
@@ -373,23 +614,7 @@ class Event(Message):
             harmonization: Harmonization definition to use
         """
         if isinstance(message, Report):
-            template = {}
-            if 'feed.accuracy' in message:
-                template['feed.accuracy'] = message['feed.accuracy']
-            if 'feed.code' in message:
-                template['feed.code'] = message['feed.code']
-            if 'feed.documentation' in message:
-                template['feed.documentation'] = message['feed.documentation']
-            if 'feed.name' in message:
-                template['feed.name'] = message['feed.name']
-            if 'feed.provider' in message:
-                template['feed.provider'] = message['feed.provider']
-            if 'feed.url' in message:
-                template['feed.url'] = message['feed.url']
-            if 'rtir_id' in message:
-                template['rtir_id'] = message['rtir_id']
-            if 'time.observation' in message:
-                template['time.observation'] = message['time.observation']
+            template = message._event_template
         else:
             template = message
         super(Event, self).__init__(template, auto, harmonization)
@@ -410,8 +635,17 @@ class Report(Message):
             time_observation = intelmq.lib.harmonization.DateTime().generate_datetime_now()
             self.add('time.observation', time_observation, sanitize=False)
 
-    def copy(self):
-        retval = super(Report, self).copy()
-        if 'time.observation' in retval and 'time.observation' not in self:
-            del retval['time.observation']
-        return retval
+    def _reset_caches(self):
+        super(Report, self)._reset_caches()
+        self._event_template_cache = None
+
+    @property
+    def _event_template(self) -> dict:
+        """
+        The fields of the report which are copied to events created from it.
+        Computed once until the report is changed.
+        """
+        if self._event_template_cache is None:
+            self._event_template_cache = {key: self[key] for key in EVENT_TEMPLATE_KEYS
+                                          if key in self}
+        return self._event_template_cache
@@ -28,6 +28,8 @@ class Pipeline(object):
         self.destination_queues = set()
         self.internal_queue = None
         self.source_queue = None
+        # binary serializations must be passed on as bytes
+        self.decode = getattr(parameters, 'serializer', 'json') == 'json'
 
     def connect(self):
         raise NotImplementedError
@@ -140,7 +142,7 @@ class Redis(Pipeline):
             if not retval:
                 retval = self.pipe.brpoplpush(self.source_queue,
                                               self.internal_queue, 0)
-            return utils.decode(retval)
+            return utils.decode(retval) if self.decode else retval
         except Exception as exc:
             raise exceptions.PipelineError(exc)
 
@@ -217,7 +219,8 @@ class Pythonlist(Pipeline):
         Does not block unlike the other pipelines.
         """
         if len(self.state.get(self.internal_queue, [])) > 0:
-            return utils.decode(self.state[self.internal_queue].pop(0))
+            retval = self.state[self.internal_queue].pop(0)
+            return utils.decode(retval) if self.decode else retval
 
         first_msg = self.state[self.source_queue].pop(0)
 
@@ -226,7 +229,7 @@ class Pythonlist(Pipeline):
         else:
             self.state[self.internal_queue] = [first_msg]
 
-        return utils.decode(first_msg)
+        return utils.decode(first_msg) if self.decode else first_msg
 
     def acknowledge(self):
         """Removes a message from the internal queue and returns it"""
@@ -2,7 +2,117 @@
 """
 Testing Mail Attach collector
 """
-import os
+import io
+import json
+import types
+import unittest
+import unittest.mock as mock
+import zipfile
 
-if os.environ.get('INTELMQ_TEST_EXOTIC'):
-    import intelmq.bots.collectors.mail.collector_mail_attach
+import intelmq.lib.test as test
+import intelmq.lib.utils as utils
+from intelmq.bots.collectors.mail.collector_mail_attach import MailAttachCollectorBot, first_zipped_file
+
+DATA = b'a,b\n1,2\n'
+
+
+def zip_content(data: bytes) -> io.BytesIO:
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, 'w', zipfile.ZIP_DEFLATED) as zipped:
+        zipped.writestr('data.csv', data)
+    content.seek(0)
+    return content
+
+
+def zip_archive(data: bytes) -> zipfile.ZipFile:
+    return zipfile.ZipFile(zip_content(data))
+
+
+class TestFirstZippedFile(unittest.TestCase):
+    """
+    Tests the size check of zipped attachments.
+    """
+
+    def test_no_limit(self):
+        with zip_archive(DATA * 100) as zipped:
+            zipinfo = first_zipped_file(zipped)
+            self.assertEqual(zipped.read(zipinfo), DATA * 100)
+
+    def test_within_limit(self):
+        with zip_archive(DATA) as zipped:
+            zipinfo = first_zipped_file(zipped, len(DATA))
+            self.assertEqual(zipinfo.filename, 'data.csv')
+
+    def test_exceeds_limit(self):
+        with zip_archive(DATA * 100) as zipped:
+            with self.assertRaises(ValueError):
+                first_zipped_file(zipped, len(DATA))
+
+
+def mail(content: io.BytesIO) -> types.SimpleNamespace:
+    return types.SimpleNamespace(subject='Report',
+                                 attachments=[{'filename': 'data.zip',
+                                               'content': content}])
+
+
+class FakeImbox(object):
+    """
+    Mailbox with a mail with an oversized attachment, one with a valid
+    attachment and one with an invalid zip file.
+    """
+    instances = []
+
+    def __init__(self, *args):
+        self.connection = mock.Mock()
+        self.instances.append(self)
+
+    def messages(self, folder, unread):
+        return [(b'2', mail(zip_content(DATA * 100))),
+                (b'10', mail(zip_content(DATA))),
+                (b'3', mail(io.BytesIO(b'no zip file')))]
+
+    def logout(self):
+        pass
+
+
+class TestMailAttachCollectorBot(test.BotTestCase, unittest.TestCase):
+    """
+    A TestCase for MailAttachCollectorBot with a fake mailbox.
+    """
+
+    @classmethod
+    def set_bot(cls):
+        cls.bot_reference = MailAttachCollectorBot
+        cls.sysconfig = {'attach_regex': 'zip',
+                         'attach_unzip': True,
+                         'feed': 'Example',
+                         'folder': 'INBOX',
+                         'mail_host': 'localhost',
+                         'mail_password': 'secret',
+                         'mail_ssl': True,
+                         'mail_user': 'user',
+                         'max_decompressed_size': len(DATA) * 10,
+                         'subject_regex': 'Report'}
+        cls.default_input_message = None
+        cls.allowed_error_count = 3
+
+    def test_mark_seen(self):
+        """
+        Test if the oversized and the valid mail are marked as read with one
+        command, although the last mail fails.
+        """
+        FakeImbox.instances = []
+        with mock.patch('intelmq.bots.collectors.mail.collector_mail_attach.imbox',
+                        types.SimpleNamespace(Imbox=FakeImbox)):
+            self.run_bot()
+        self.assertEqual(len(self.get_output_queue()), 1)
+        report = json.loads(self.get_output_queue()[0])
+        self.assertEqual(utils.base64_decode(report['raw']), DATA.decode())
+        self.assertRegexpMatchesLog("Ignoring attachment 'data.zip': Decompressed size")
+        self.assertRegexpMatchesLog('File is not a zip file')
+        FakeImbox.instances[0].connection.uid.assert_called_once_with('STORE', '2,10', '+FLAGS',
+                                                                      r'(\Seen)')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    unittest.main()
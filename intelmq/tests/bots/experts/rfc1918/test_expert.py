@@ -17,6 +17,10 @@ OUTPUT1 = {"__type": "Event",
            "source.ip": "93.184.216.34",  # example.com
            "time.observation": "2015-01-01T00:00:00+00:00",
            }
+INPUT_IPV6 = {"__type": "Event",
+              "destination.ip": "2001:db8::1",  # documentation
+              "time.observation": "2015-01-01T00:00:00+00:00",
+              }
 INPUT2 = {"__type": "Event",
           "source.ip": "192.168.0.1",  # internal
           "time.observation": "2015-01-01T00:00:00+00:00",
@@ -56,6 +60,11 @@ class TestRFC1918ExpertBot(test.BotTestCase, unittest.TestCase):
         self.run_bot()
         self.assertMessageEqual(0, OUTPUT1)
 
+    def test_del_ipv6(self):
+        self.input_message = INPUT_IPV6
+        self.run_bot()
+        self.assertMessageEqual(0, OUTPUT_DOMAIN)
+
     def test_drop(self):
         self.input_message = INPUT2
         self.run_bot()
@@ -76,6 +85,13 @@ class TestRFC1918ExpertBot(test.BotTestCase, unittest.TestCase):
         self.run_bot()
         self.assertOutputQueueLen(0)
 
+    def test_unsupported_field(self):
+        """ Test if fields without a supported suffix are rejected at initialization. """
+        self.sysconfig = {'fields': 'source.ip,source.network',
+                          'policy': 'del,del'}
+        with self.assertRaisesRegex(ValueError, "Field 'source.network' is not supported"):
+            self.prepare_bot()
+
 
 if __name__ == '__main__':  # pragma: no cover
     unittest.main()
@@ -34,5 +34,23 @@ class TestOpenPhishParserBot(test.BotTestCase, unittest.TestCase):
         self.assertMessageEqual(0, OUTPUT1)
         self.assertMessageEqual(1, OUTPUT2)
 
+    def test_line_endings_crlf(self):
+        """ Test CRLF line endings, an empty line and a missing trailing newline. """
+        raw = b'http://www..example.com/phishing\r\n\r\nhttp://www..example.invalid/phishing'
+        self.input_message = {'__type': 'Report', 'raw': base64.b64encode(raw).decode()}
+        self.run_bot()
+        self.assertMessageEqual(0, OUTPUT1)
+        self.assertMessageEqual(1, OUTPUT2)
+        self.assertEqual(len(self.get_output_queue()), 2)
+
+    def test_line_endings_cr(self):
+        """ Test CR-only line endings. """
+        raw = b'http://www..example.com/phishing\rhttp://www..example.invalid/phishing\n'
+        self.input_message = {'__type': 'Report', 'raw': base64.b64encode(raw).decode()}
+        self.run_bot()
+        self.assertMessageEqual(0, OUTPUT1)
+        self.assertMessageEqual(1, OUTPUT2)
+        self.assertEqual(len(self.get_output_queue()), 2)
+
 if __name__ == '__main__':  # pragma: no cover
     unittest.main()
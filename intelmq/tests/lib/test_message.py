@@ -8,6 +8,7 @@ but has a valid Harmonization configuration.
 """
 import json
 import unittest
+import unittest.mock as mock
 
 import pkg_resources
 
@@ -251,6 +252,21 @@ class TestMessageFactory(unittest.TestCase):
             report.add(key, value)
         self.assertDictEqual(FEED, dict(report.finditems('feed.')))
 
+    def test_event_finditems_sorted(self):
+        """ Test if finditems() yields sorted items and reflects changes. """
+        event = self.new_event()
+        event.add('source.port', 80)
+        event.add('feed.name', 'Example')
+        event.add('source.ip', '192.0.2.1')
+        self.assertEqual([('source.ip', '192.0.2.1'), ('source.port', 80)],
+                         list(event.finditems('source.')))
+        event.add('source.asn', 64496)
+        del event['source.port']
+        self.assertEqual([('source.asn', 64496), ('source.ip', '192.0.2.1')],
+                         list(event.finditems('source.')))
+        self.assertEqual([], list(event.finditems('z')))
+        self.assertEqual([], list(self.new_event().finditems('source.')))
+
     def test_report_items(self):
         """ Test if report returns all keys in list with items(). """
         report = self.new_report(auto=True)
@@ -344,10 +360,20 @@ class TestMessageFactory(unittest.TestCase):
                             set(report.items()))
 
     def test_deep_copy_items(self):
-        """ Test if deep_copy does not return the same objects. """
+        """ Test if deep_copy returns an independent copy. """
         report = self.new_report(examples=True)
-        self.assertNotEqual(set(map(id, report.deep_copy())),
-                            set(map(id, report)))
+        copied = report.deep_copy()
+        copied.change('feed.name', 'Other')
+        copied.add('feed.code', 'code')
+        self.assertEqual(report['feed.name'], 'Example')
+        self.assertNotIn('feed.code', report)
+
+    def test_deep_copy_type(self):
+        """ Test if deep_copy returns the same type. """
+        event = self.new_event()
+        self.assertIs(type(event.deep_copy()), message.Event)
+        report = self.new_report(auto=True, examples=True)
+        self.assertNotIn('time.observation', report.deep_copy())
 
     def test_deep_copy_object(self):
         """ Test if depp_copy does not return the same object. """
@@ -366,6 +392,18 @@ class TestMessageFactory(unittest.TestCase):
         self.assertEqual(set(map(id, report.copy())),
                          set(map(id, report)))
 
+    def test_copy_independent(self):
+        """ Test if copy returns an independent copy of the same type. """
+        report = self.new_report(auto=True, examples=True)
+        report.hash()
+        copied = report.copy()
+        self.assertIs(type(copied), message.Report)
+        self.assertNotIn('time.observation', copied)
+        self.assertEqual(report.hash(), copied.hash())
+        copied.change('feed.name', 'Other')
+        self.assertEqual(report['feed.name'], 'Example')
+        self.assertNotEqual(report.hash(), copied.hash())
+
     def test_copy_object(self):
         """ Test if copy does not return the same object. """
         report = self.new_report(examples=True)
@@ -390,6 +428,18 @@ class TestMessageFactory(unittest.TestCase):
         self.assertEqual(event1.hash(),
                          'd04aa050afdc58a39329c78c3b59ce6fb6f11effe180fe8084b4f1e89007de71')
 
+    def test_event_hash_fixed_types(self):
+        """ Test if Event hash hasn't changed unintentionally for all value types. """
+        event = self.new_event()
+        event.add('feed.accuracy', 50.5)
+        event.add('source.asn', 64496)
+        event.add('source.local_hostname', 'ä€𝄞 hostname')
+        event.add('extra', {'b': 1, 'a': [True, None]})
+        event.add('feed.name', 'Example')
+        event.add('source.tor_node', True)
+        self.assertEqual(event.hash(),
+                         'f7fa241b21f72aa0890608f3736a08f0d27041b010352dba3b83a2cd421ea25d')
+
     def test_event_hash_method(self):
         """ Test Event hash() 'time.observation' should be ignored. """
         event = self.new_event()
@@ -442,6 +492,21 @@ class TestMessageFactory(unittest.TestCase):
                          event2.hash(filter_type="whitelist",
                                      filter_keys={"feed.url, raw"}))
 
+    def test_event_hash_cache(self):
+        """ Test if the cached hash is updated on changes. """
+        event = self.add_event_examples(self.new_event())
+        original = event.hash()
+        self.assertEqual(original, event.hash())
+        event.serialize()
+        self.assertEqual(original, event.hash())
+        event.change('feed.name', 'Other')
+        changed = event.hash()
+        self.assertNotEqual(original, changed)
+        del event['feed.name']
+        self.assertNotEqual(changed, event.hash())
+        event.update({'feed.name': 'Example'})
+        self.assertEqual(original, event.hash())
+
     def test_event_dict(self):
         """ Test Event to_dict. """
         event = self.new_event()
@@ -488,20 +553,78 @@ class TestMessageFactory(unittest.TestCase):
     def test_event_serialize(self):
         """ Test Event serialize. """
         event = self.new_event()
-        self.assertEqual('{"__type": "Event"}',
-                         event.serialize())
+        self.assertDictEqual({"__type": "Event"},
+                             json.loads(event.serialize()))
 
     def test_event_string(self):
         """ Test Event serialize. """
         event = self.new_event()
-        self.assertEqual('{"__type": "Event"}',
-                         event.serialize())
+        self.assertDictEqual({"__type": "Event"},
+                             json.loads(event.serialize()))
 
     def test_event_unicode(self):
         """ Test Event serialize. """
         event = self.new_event()
-        self.assertEqual('{"__type": "Event"}',
-                         event.serialize())
+        self.assertDictEqual({"__type": "Event"},
+                             json.loads(event.serialize()))
+
+    @unittest.skipIf(message.msgpack is None, 'msgpack is not installed.')
+    def test_event_serialize_msgpack(self):
+        """ Test Event serialize and unserialize with msgpack. """
+        event = self.new_event()
+        event = self.add_event_examples(event)
+        raw = message.MessageFactory.serialize(event, serializer='msgpack')
+        self.assertIsInstance(raw, bytes)
+        self.assertEqual(event,
+                         message.MessageFactory.unserialize(raw, harmonization=HARM,
+                                                            serializer='msgpack'))
+
+    @unittest.skipIf(message.msgpack is None, 'msgpack is not installed.')
+    def test_serialize_msgpack_big_integer(self):
+        """ Test if msgpack serialization rejects integers larger than 64 bit. """
+        event = self.new_event()
+        event.add('rtir_id', 2 ** 70 + 1)
+        with self.assertRaises(exceptions.InvalidValue):
+            event.serialize(serializer='msgpack')
+
+    def test_serialize_invalid_serializer(self):
+        """ Test if unknown serializers are rejected. """
+        event = self.new_event()
+        with self.assertRaises(exceptions.InvalidArgument):
+            event.serialize(serializer='xml')
+
+    def test_serialize_big_integer(self):
+        """ Test if integers larger than 64 bit survive serialization. """
+        event = self.new_event()
+        event.add('rtir_id', 2 ** 70 + 1)
+        event.add('feed.accuracy', 50.5)
+        unserialized = message.MessageFactory.unserialize(event.serialize(),
+                                                          harmonization=HARM)
+        self.assertEqual(unserialized['rtir_id'], 2 ** 70 + 1)
+        self.assertIsInstance(unserialized['rtir_id'], int)
+        self.assertEqual(unserialized['feed.accuracy'], 50.5)
+
+    def test_serialize_infinite_float(self):
+        """ Test if infinite floats survive serialization. """
+        event = self.new_event()
+        event.add('source.geolocation.latitude', 'inf')
+        unserialized = message.MessageFactory.unserialize(event.serialize(),
+                                                          harmonization=HARM)
+        self.assertEqual(unserialized['source.geolocation.latitude'], float('inf'))
+
+    def test_unserialize_infinite_float(self):
+        """ Test if infinite floats written by json can be unserialized. """
+        raw = json.dumps({'__type': 'Event', 'source.geolocation.latitude': float('inf')})
+        unserialized = message.MessageFactory.unserialize(raw, harmonization=HARM)
+        self.assertEqual(unserialized['source.geolocation.latitude'], float('inf'))
+
+    def test_serialize_lone_surrogate(self):
+        """ Test if strings with lone surrogates survive serialization. """
+        event = self.new_event()
+        event.add('feed.name', 'a\ud800b')
+        unserialized = message.MessageFactory.unserialize(event.serialize(),
+                                                          harmonization=HARM)
+        self.assertEqual(unserialized['feed.name'], 'a\ud800b')
 
     def test_event_from_report(self):
         report = self.new_report()
@@ -509,6 +632,19 @@ class TestMessageFactory(unittest.TestCase):
         event = message.Event(report, harmonization=HARM)
         self.assertDictContainsSubset(event, FEED_FIELDS)
 
+    def test_event_from_report_changed(self):
+        """ Test if events use the current fields of a changed report. """
+        report = self.new_report(examples=True)
+        message.Event(report, harmonization=HARM)
+        report.change('feed.name', 'Other')
+        report.add('rtir_id', 1337)
+        del report['feed.url']
+        event = message.Event(report, harmonization=HARM)
+        self.assertEqual(event['feed.name'], 'Other')
+        self.assertEqual(event['rtir_id'], 1337)
+        self.assertNotIn('feed.url', event)
+        self.assertNotIn('raw', event)
+
     def test_event_hash_regex(self):
         """ Test if the regex for event_hash is tested correctly. """
         event = self.new_event()
@@ -601,18 +737,54 @@ class TestMessageFactory(unittest.TestCase):
         with self.assertRaises(exceptions.InvalidValue):
             event.change('source.registry', 'afri nic', sanitize=False)
 
+    def test_event_init_sanitize(self):
+        """ Test if initialization method sanitizes fields if necessary. """
+        event = message.Event({'feed.accuracy': ACCURACY_UNSANE, 'feed.name': 'Example',
+                               'source.asn': None}, harmonization=HARM)
+        self.assertDictEqual({'feed.accuracy': ACCURACY_SANE, 'feed.name': 'Example'},
+                             event)
+
+    def test_message_update_sanitize(self):
+        """ Test if Message.update sanitizes and deletes fields. """
+        event = self.new_event()
+        event.add('feed.name', 'Example')
+        event.add('source.asn', 1)
+        event.update({'feed.accuracy': ACCURACY_UNSANE, 'feed.name': 'Other',
+                      'source.asn': '-'})
+        self.assertDictEqual({'feed.accuracy': ACCURACY_SANE, 'feed.name': 'Other'},
+                             event)
+
     def test_message_update(self):
         """ Test Message.update """
         event = self.new_event()
         with self.assertRaises(exceptions.InvalidValue):
             event.update({'source.asn': 'AS1'})
 
+    def test_harmonization_cached(self):
+        """ Test if the harmonization configuration is loaded only once. """
+        message._load_harmonization.cache_clear()
+        with mock.patch('intelmq.lib.utils.load_configuration',
+                        return_value=HARM) as load_configuration:
+            message.Event()
+            message.Event()
+        message._load_harmonization.cache_clear()
+        load_configuration.assert_called_once_with(message.HARMONIZATION_CONF_FILE)
+
     def test_invalid_harm_key(self):
         """ Test if error is raised when using an invalid key. """
         with self.assertRaises(exceptions.InvalidKey):
             message.Event(harmonization={'event': {'foo..bar': {}}})
         with self.assertRaises(exceptions.InvalidKey):
             message.Event(harmonization={'event': {'foo.bar.': {}}})
+        with self.assertRaises(exceptions.InvalidKey):
+            message.Event(harmonization={'event': {'foo.bar\n': {}}})
+
+    def test_invalid_harm_key_repeated(self):
+        """ Test if error is raised for every message with an invalid key. """
+        harmonization = {'event': {'foo..bar': {}}}
+        for _ in range(2):
+            with self.assertRaises(exceptions.InvalidKey):
+                message.Event(harmonization=harmonization)
 
 
 if __name__ == '__main__':  # pragma: no cover  # pragma: no cover
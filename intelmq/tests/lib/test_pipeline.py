@@ -65,6 +65,12 @@ class TestPythonlist(unittest.TestCase):
         self.assertEqual(self.pipe.count_queued_messages('test-bot-input', 'test-bot-output'),
                          {'test-bot-input': 1, 'test-bot-output': 2})
 
+    def test_receive_binary(self):
+        """ Binary serializers get the bytes as they are. """
+        self.pipe.decode = False
+        self.pipe.state['test-bot-input'] = [SAMPLES['unicode'][0]]
+        self.assertEqual(SAMPLES['unicode'][0], self.pipe.receive())
+
     def tearDown(self):
         self.pipe.state = {}
 